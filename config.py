@@ -0,0 +1,43 @@
+"""
+Script Name: config.py
+Author: Nikolai West
+Date Created: 28.08.2026
+Version: 1.0.0
+"""
+
+# default
+import os
+import json
+import logging
+
+# Logger shared by the configuration helpers
+logger = logging.getLogger(__name__)
+
+
+def get_name() -> str:
+    """Derives the unit name from the parent directory of this repository."""
+    cur_path = os.path.dirname(os.path.abspath(__file__))
+    parent_dir = os.path.dirname(cur_path)
+    return os.path.basename(parent_dir)
+
+
+def load_json(path: str) -> dict:
+    """Loads JSON data from a file, returning it as a dictionary."""
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        logger.error(f"File not found: {path}")
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid JSON file provided: {e}", exc_info=e)
+    # Returns None if loading fails
+    return None
+
+
+def load_server_creds(name: str) -> tuple:
+    """Loads the server IP and port from the unit's configuration file."""
+    path = f"/home/{name}/wafer-handling-cell/server.json"
+    credentials = load_json(path)
+    if credentials is None:
+        raise ValueError(f"Credentials could not be loaded: {path}")
+    return credentials.get("ip", ""), credentials.get("port", 0)
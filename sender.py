@@ -7,16 +7,23 @@ Version: 1.0.3
 """
 
 # default
-import os
-import json
+import math
 import time
+import random
 import socket
+import struct
 import itertools
-from datetime import datetime
 
 # other
 from sense_hat import SenseHat
 
+# project
+import config
+
+# Binary wire format shared with server.py: timestamp (double), Pi number
+# (unsigned byte), then roll, pitch, yaw, gyro x/y/z and accel x/y/z (floats)
+PACKET_STRUCT = struct.Struct("<dB9f")
+
 
 class Sender:
     """Handles data collection from the Sense HAT and transmission to a server."""
@@ -38,42 +45,105 @@ class Sender:
         # Iterators for LED index and update frequency
         self.iter_led_idx = itertools.cycle(range(8))
         self.iter_led_upd = itertools.cycle(range(10))
+        # Local copy of the 8x8 LED framebuffer, pushed in one call per update
+        self.led_buf = [(0, 0, 0)] * 64
+        # List of packed sample packets batched for a single scatter-gather send
+        self.chunks: list = []
+        # Number of samples currently held in the buffer
+        self.buf_count: int = 0
+        # Numeric identifier of this Pi, sent in every binary packet
+        self.pi_num = int("".join(c for c in self.name if c.isdigit()) or 0)
+        # Number of samples to collect before sending
+        self.batch_size: int = 32
+        # Maximum time in seconds to hold samples before sending
+        self.flush_interval: float = 0.1
+        # Time of the last flush, used to enforce the flush interval
+        self.last_flush: float = time.monotonic()
+
+    def fetch_imu(self) -> tuple:
+        """Polls the IMU once and returns orientation, gyroscope and accelerometer vectors.
+
+        One poll through RTIMULib yields the fused orientation and both raw
+        vectors at the same time; calling the three public getters instead
+        would trigger three separate I2C transactions per sample.
+        """
+        try:
+            # Poll the IMU once, then read all three vectors from the result
+            self.sense_hat._read_imu()
+            data = self.sense_hat._imu.getIMUData()
+        except AttributeError:
+            # Private RTIMULib API not available, fall back to the public getters
+            ori = self.sense_hat.get_orientation_degrees()
+            gyr = self.sense_hat.get_gyroscope_raw()
+            acc = self.sense_hat.get_accelerometer_raw()
+            return (
+                (ori["roll"], ori["pitch"], ori["yaw"]),
+                (gyr["x"], gyr["y"], gyr["z"]),
+                (acc["x"], acc["y"], acc["z"]),
+            )
+        # Fused orientation is in radians, convert to degrees in range 0-360°
+        roll, pitch, yaw = data["fusionPose"]
+        ori = (
+            math.degrees(roll) % 360,
+            math.degrees(pitch) % 360,
+            math.degrees(yaw) % 360,
+        )
+        return ori, data["gyro"], data["accel"]
 
-    def fetch_data(self) -> str:
-        """Collects sensor data from the Sense HAT and formats it as a string."""
-        # Orientation in degree(0-360°) using aircraft axes (roll, pitch, yaw)
-        ori = self.sense_hat.get_orientation_degrees()
-        ori_str = f'{ori["roll"]},{ori["pitch"]},{ori["yaw"]},'
-        # Raw gyroscope data in radians per second (x, y, z)
-        gyr = self.sense_hat.get_gyroscope_raw()
-        gyr_str = f'{gyr["x"]},{gyr["y"]},{gyr["z"]},'
-        # Raw accelerometer data in Gs (x, y, z)
-        acc = self.sense_hat.get_accelerometer_raw()
-        acc_str = f'{acc["x"]},{acc["y"]},{acc["z"]}'
-        # Get time after fetching as timestamp
-        time_str = datetime.now().strftime("%H:%M:%S.%f")
-        # Format and return the data as a string
-        return f"{time_str},{self.name},{ori_str}{gyr_str}{acc_str}"
+    def fetch_data(self) -> bytes:
+        """Collects sensor data from the Sense HAT and packs it into one binary packet."""
+        # Orientation in degree(0-360°) using aircraft axes (roll, pitch, yaw),
+        # raw gyroscope data in radians per second (x, y, z) and raw
+        # accelerometer data in Gs (x, y, z), from a single IMU poll
+        ori, gyr, acc = self.fetch_imu()
+        # Pack the timestamp, Pi number and the nine readings into a fixed-size packet
+        return PACKET_STRUCT.pack(time.time(), self.pi_num, *ori, *gyr, *acc)
 
     def send_data(self):
-        """Sends the collected data to the server via TCP."""
+        """Collects a sample into the batch buffer and sends it once the batch is full."""
         # Establish a connection if not already connected
         if not self.sock:
             self.reconnect()
-        # Send data
+        # Append the packed sample to the batch for a scatter-gather send
+        self.chunks.append(self.fetch_data())
+        self.buf_count += 1
+        # Send the batch once it is full or the flush interval has elapsed
+        if (
+            self.buf_count >= self.batch_size
+            or time.monotonic() - self.last_flush >= self.flush_interval
+        ):
+            self.flush_data()
+
+    def flush_data(self):
+        """Sends the buffered batch of samples to the server in a single call."""
         try:
-            # Fetch the sensor data
-            data = self.fetch_data()
-            # Attempt to send data
-            self.sock.sendall(data.encode("utf-8"))
+            self.send_chunks()
         # Handle potential sending errors
         except socket.error as e:
             print(f"Attempting to reconnect after connection error: {e}.")
             self.reconnect()
             try:
-                self.sock.sendall(data.encode("utf-8"))
+                self.send_chunks()
             except socket.error as e:
                 print(f"Failed to send data after reconnecting: {e}")
+        # Reset the buffer regardless of success to avoid unbounded growth
+        self.chunks.clear()
+        self.buf_count = 0
+        self.last_flush = time.monotonic()
+
+    def send_chunks(self):
+        """Sends the batched packets completely via one scatter-gather call.
+
+        Unlike sendall, sendmsg may transmit only part of the batch and
+        return the byte count; a short send would permanently misalign the
+        fixed-size packet framing on the server, so any remainder is pushed
+        out with sendall before returning.
+        """
+        # Hand the fragment list to the kernel in one scatter-gather send
+        sent = self.sock.sendmsg(self.chunks)
+        total = sum(len(chunk) for chunk in self.chunks)
+        if sent < total:
+            self.sock.sendall(b"".join(self.chunks)[sent:])
 
     def reconnect(self):
         """Attempts to reconnect to the server with exponential backoff."""
@@ -86,8 +156,9 @@ class Sender:
             finally:
                 self.sock = None
 
-        # Exponential backoff sequence for reconnection attempts
-        reconnect_wait_times = [1, 2, 4, 8, 16, 32]
+        # Exponential backoff sequence for reconnection attempts, starting
+        # short so transient Wi-Fi blips only cost a fraction of a second
+        reconnect_wait_times = [0.1, 0.25, 0.5, 1, 2, 4, 8, 16]
 
         # Start an indefinite loop for reconnection attempts
         while True:
@@ -103,6 +174,18 @@ class Sender:
             try:
                 self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
                 self.sock.connect((self.server_ip, self.server_port))
+                # Disable Nagle's algorithm so small sample batches are not delayed
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                # Enable keepalives so the OS notices dead peers before the
+                # application has to fall back to reconnecting
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                if hasattr(socket, "TCP_KEEPIDLE"):
+                    # Probe after 30 s idle, every 10 s, give up after 3 misses
+                    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+                    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+                    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+                # Cap the send buffer to keep latency predictable
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 16)
                 print("Successfully reconnected to the server.")
                 # Reset the counter after a successful connection
                 self.cur_recon_attempts = 0
@@ -116,53 +199,59 @@ class Sender:
                 # Update the LED to indicate a retry
                 self.update_led_pb("r")
 
-                # Set a wait time based on reconnection attepts
-                if self.max_recon_attempts is None:
-                    wait_time = (
-                        reconnect_wait_times[-1]
-                        if self.cur_recon_attempts > len(reconnect_wait_times)
-                        else min(60, 2 ** (self.cur_recon_attempts - 1))
-                    )
-                else:
-                    wait_time_index = min(
-                        self.cur_recon_attempts - 1, len(reconnect_wait_times) - 1
-                    )
-                    wait_time = min(reconnect_wait_times[wait_time_index], 60)
-                print(f"Waiting {wait_time} seconds before retrying...")
+                # Set a wait time based on reconnection attempts, with jitter
+                # so several Pis don't retry in lockstep after an outage
+                wait_time_index = min(
+                    self.cur_recon_attempts - 1, len(reconnect_wait_times) - 1
+                )
+                wait_time = reconnect_wait_times[wait_time_index] * random.uniform(
+                    0.8, 1.2
+                )
+                print(f"Waiting {wait_time:.2f} seconds before retrying...")
                 time.sleep(wait_time)
 
     def set_led_number(self):
         """Displays the Raspberry Pi's identifier number on the Sense HAT's LED matrix."""
         pixel_path = f"/home/{self.name}/wafer-handling-cell/numbers.json"
-        pixel_list = self.load_json(pixel_path)[self.name]
-        self.sense_hat.set_pixels(pixel_list)
+        pixel_list = config.load_json(pixel_path)[self.name]
+        # Keep the local framebuffer in sync so progress updates don't erase it
+        self.led_buf = [tuple(pixel) for pixel in pixel_list]
+        self.sense_hat.set_pixels(self.led_buf)
 
     def update_led_pb(self, color: str = "b"):
         """Updates the LED matrix to visually indicate the script's progress and status."""
         idx_next = next(self.iter_led_idx)
         idx_last = 7 if idx_next == 0 else idx_next - 1
-        # Reset the last pixel
-        self.sense_hat.set_pixel(0, idx_last, (0, 0, 0))
-        # Set current pixel according to selected color
+        # Select the pixel color for the current status
         col_next = (
             (255, 0, 0)
             if color == "r"
             else (0, 255, 0) if color == "g" else (0, 0, 255)
         )
-        self.sense_hat.set_pixel(0, idx_next, col_next)
+        # Mutate the local framebuffer and push it in a single call; each
+        # set_pixel would transfer the full 8x8 matrix on its own
+        self.led_buf[idx_last * 8] = (0, 0, 0)
+        self.led_buf[idx_next * 8] = col_next
+        self.sense_hat.set_pixels(self.led_buf)
 
     def run(self):
         """Main loop to continuously send sensor data to the server."""
         # Display the Pi's identifier on startup
         self.set_led_number()
 
+        # Bind the per-sample calls to locals once, saving an attribute
+        # lookup per call in the hot loop
+        send_data = self.send_data
+        update_led_pb = self.update_led_pb
+        next_led_upd = self.iter_led_upd.__next__
+
         while True:
             try:
                 # Send data to the server
-                self.send_data()
+                send_data()
                 # Update the LED matrix periodically to indicate successful data sends
-                if next(self.iter_led_upd) == 0:
-                    self.update_led_pb("g")
+                if next_led_upd() == 0:
+                    update_led_pb("g")
             except KeyboardInterrupt:
                 print("Sender stopped by user.")
                 self.sense_hat.show_letter("A", text_colour=(0, 0, 255))  # aborted
@@ -171,28 +260,9 @@ class Sender:
                 print(f"An error occurred: {e}")
                 self.reconnect()
 
-    def load_json(self, path: str) -> dict:
-        """Loads JSON data from a file, returning it as a dictionary."""
-        try:
-            with open(path, "r") as file:
-                return json.load(file)
-        except FileNotFoundError:
-            print(f"File not found: {path}")
-        except json.JSONDecodeError as e:
-            print(f"Invalid JSON file provided: {e}")
-        # Return None or an empty dict if loading fails.
-        return None
-
     def set_name(self) -> None:
-        cur_path = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(cur_path)
-        self.name = os.path.basename(parent_dir)
+        self.name = config.get_name()
 
     def set_server_creds(self) -> None:
         """Sets the server IP and port based on the loaded server credentials."""
-        path = f"/home/{self.name}/wafer-handling-cell/server.json"
-        credentials = self.load_json(path)
-        if credentials is None:
-            raise ValueError(f"Credentials could not be loaded: {path}")
-        self.server_ip = credentials.get("ip", "")
-        self.server_port = credentials.get("port", 0)
+        self.server_ip, self.server_port = config.load_server_creds(self.name)
@@ -8,11 +8,31 @@ Version: 1.0.3
 
 # default
 import os
-import csv
-import json
+import math
+import time
 import socket
+import struct
 import logging
-import threading
+import selectors
+
+# project
+import config
+
+# Binary wire format shared with sender.py: timestamp (double), Pi number
+# (unsigned byte), then roll, pitch, yaw, gyro x/y/z and accel x/y/z (floats)
+PACKET_STRUCT = struct.Struct("<dB9f")
+
+
+class ClientBuffer:
+    """Reusable receive buffer and fill state for one client connection."""
+
+    def __init__(self, size: int = 65536):
+        # Fixed buffer that recv_into fills, avoiding a bytes object per recv
+        self.data = bytearray(size)
+        # Persistent view for zero-copy slicing of the buffer
+        self.view = memoryview(self.data)
+        # Number of buffered bytes not yet parsed into packets
+        self.end: int = 0
 
 
 class Server:
@@ -26,71 +46,187 @@ class Server:
         self.set_name()
         # Set the server IP and port from a configuration file
         self.set_server_creds()
+        # Pending formatted rows, written out one chunk at a time
+        self.out_buf = bytearray()
+        # Number of pending bytes that triggers a write, one SD card block
+        self.write_chunk_size: int = 4096
         # Initialize the output file
         self.set_output_csv()
         # Creates a TCP/IP socket
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         # Allows the socket to reuse the address
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        # List of IP addresses allowed to connect to this server
-        self.allowed_ips = [
-            "192.168.0.201",
-            "192.168.0.202",
-            "192.168.0.203",
-            "192.168.0.204",
-        ]
+        # Also allow additional server processes to bind the same port, with
+        # the kernel load-balancing accepted connections between them
+        if hasattr(socket, "SO_REUSEPORT"):
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        # Selector multiplexing the listening and client sockets, set up in listen
+        self.selector = None
+        # Pre-encoded Pi name fields, keyed by the packet's Pi number
+        self.pi_names: dict = {}
+        # IP addresses allowed to connect to this server; a frozenset makes
+        # the membership check O(1) and documents that the list is fixed
+        self.allowed_ips = frozenset(
+            {
+                "192.168.0.201",
+                "192.168.0.202",
+                "192.168.0.203",
+                "192.168.0.204",
+            }
+        )
 
     def listen(self):
-        """Listens for incoming connections and handles them if they are from allowed IPs."""
+        """Multiplexes all client connections on a single thread via selectors."""
         # Bind the socket to the configured IP and port
         self.sock.bind((self.server_ip, self.server_port))
         # Listen for connections, queueing up to 5 connection requests
         self.sock.listen(5)
+        # All sockets are non-blocking and driven by the selector (epoll on Linux)
+        self.sock.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        # The listening socket is registered without data to mark it as such
+        self.selector.register(self.sock, selectors.EVENT_READ, data=None)
         self.logger.info(f"Server listening on {self.server_ip}:{self.server_port}")
 
         while True:
-            # Accept a new connection
+            events = self.selector.select(timeout=1.0)
+            if not events and self.out_buf:
+                # Quiet period, push out the pending rows so they don't go stale
+                os.write(self.csv_fd, self.out_buf)
+                self.out_buf.clear()
+                continue
+            for key, _ in events:
+                if key.data is None:
+                    # Event on the listening socket: a new connection
+                    self.accept_client()
+                else:
+                    # Event on a client socket: data is ready to be read
+                    self.handle_client(key)
+
+    def accept_client(self):
+        """Accepts a new connection and registers it if the IP address is allowed."""
+        try:
             client, address = self.sock.accept()
-            ip_address = address[0]
-            # Checks if the IP address is allowed
-            if ip_address in self.allowed_ips:
-                # Create a new thread for each client connection
-                client_thread = threading.Thread(
-                    target=self.handle_client, args=(client,)
-                )
-                client_thread.start()  # Start the thread
-            else:
-                self.logger.warning(
-                    f"Connection attempt from unauthorized IP address: {ip_address}"
-                )
-                client.close()
-
-    def handle_client(self, client_socket):
-        """Receives data from a client and continuously saves it until the connection is closed."""
+        except OSError as e:
+            # The peer can reset between select() and accept(); one failed
+            # handshake must not take down the server for all clients
+            self.logger.warning(f"Failed to accept a connection: {e}")
+            return
+        ip_address = address[0]
+        # Checks if the IP address is allowed
+        if ip_address in self.allowed_ips:
+            client.setblocking(False)
+            # Disable Nagle's algorithm for low-latency acknowledgements
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Enable keepalives so dead Pis are detected without waiting on recv
+            client.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            # Give each client a generous receive buffer for bursts
+            client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 16)
+            # Fail blocked transmissions after 30 s on Linux
+            if hasattr(socket, "TCP_USER_TIMEOUT"):
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, 30000)
+            # Register the client with its own reusable receive buffer
+            self.selector.register(client, selectors.EVENT_READ, data=ClientBuffer())
+            self.logger.info(f"Accepted connection from {ip_address}")
+        else:
+            self.logger.warning(
+                f"Connection attempt from unauthorized IP address: {ip_address}"
+            )
+            client.close()
+
+    def handle_client(self, key):
+        """Reads available data from a client and saves every complete packet."""
+        client_socket = key.fileobj
+        state = key.data
+        packet_size = PACKET_STRUCT.size
         try:
-            while True:
-                # Attempt to receive data from the client
-                message = client_socket.recv(1024).decode("utf-8")
-                # Break the loop if no data is received, indicating the client has closed the connection
-                if not message:
-                    break
-                # Save the received data
-                self.save_data(message)
+            # Receive straight into the reusable buffer behind the residual
+            received = client_socket.recv_into(state.view[state.end :])
+        except BlockingIOError:
+            # Spurious wakeup, nothing to read yet
+            return
         except socket.error as e:
             self.logger.error(f"Socket error: {e}")
-        finally:
-            # Close the connection once done
-            client_socket.close()
+            self.close_client(client_socket, state)
+            return
+        # Zero received bytes means the client has closed the connection
+        if not received:
+            self.close_client(client_socket, state)
+            return
+        # Unpack and save every complete packet, keeping the residual;
+        # iter_unpack walks the packets in C instead of a Python offset loop
+        state.end += received
+        complete = state.end - state.end % packet_size
+        if complete:
+            try:
+                save_data = self.save_data
+                for record in PACKET_STRUCT.iter_unpack(state.view[:complete]):
+                    save_data(record)
+            except (OverflowError, ValueError, OSError) as e:
+                # A garbage timestamp or a failed write must only cost this
+                # client, not the whole server
+                self.logger.error(f"Dropping client after bad data: {e}")
+                self.close_client(client_socket, state)
+                return
+            # Move the partial trailing packet, if any, to the buffer front
+            residual = state.end - complete
+            if residual:
+                state.view[:residual] = state.view[complete : state.end]
+            state.end = residual
 
-    def save_data(self, data):
-        """Saves the received data along with a timestamp to the CSV file."""
-        # Split the received data string into parts
-        parts = data.split(",")
+    def close_client(self, client_socket, state):
+        """Unregisters a client from the selector and closes its socket."""
+        # A residual on disconnect means a packet was cut off mid-send
+        if state.end:
+            self.logger.warning(
+                f"Discarding {state.end} bytes of an incomplete packet."
+            )
+        self.selector.unregister(client_socket)
+        client_socket.close()
 
-        # Write the data row
-        with open(self.csv_path, "a", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(parts)
+    def format_time(self, timestamp: float) -> str:
+        """Formats an epoch timestamp as HH:MM:SS.ffffff without datetime/strftime.
+
+        datetime.fromtimestamp plus strftime allocates an object and runs a
+        locale-aware formatter per row; splitting the timestamp with one
+        divmod and letting time.localtime (a cheap, DST-aware C call)
+        provide the wall-clock fields is far lighter.
+        """
+        # Split and round exactly like datetime.fromtimestamp does, so the
+        # output matches the old strftime path to the microsecond
+        fraction, seconds = math.modf(timestamp)
+        microseconds = round(fraction * 1_000_000)
+        if microseconds >= 1_000_000:
+            seconds += 1
+            microseconds -= 1_000_000
+        elif microseconds < 0:
+            seconds -= 1
+            microseconds += 1_000_000
+        wall = time.localtime(seconds)
+        return (
+            f"{wall.tm_hour:02d}:{wall.tm_min:02d}:"
+            f"{wall.tm_sec:02d}.{microseconds:06d}"
+        )
+
+    def save_data(self, record):
+        """Formats an unpacked sensor packet as a CSV line and buffers it for writing."""
+        # Rebuild the timestamp and Pi name, then append the nine readings
+        timestamp, pi_num, *values = record
+        name_bytes = self.pi_names.get(pi_num)
+        if name_bytes is None:
+            name_bytes = self.pi_names[pi_num] = f"rpi{pi_num:02d}".encode("utf-8")
+        # One join over the encoded fields builds the row without the
+        # intermediate strings an f-string chain would allocate
+        # 9 significant digits round-trip the float32 wire values exactly,
+        # without the float64 noise digits repr would append
+        row = [self.format_time(timestamp).encode("utf-8"), name_bytes]
+        row += [b"%.9g" % value for value in values]
+        self.out_buf += b",".join(row)
+        self.out_buf += b"\n"
+        # Write a full chunk straight to the fd, bypassing Python's io stack
+        if len(self.out_buf) >= self.write_chunk_size:
+            os.write(self.csv_fd, self.out_buf)
+            self.out_buf.clear()
 
     def run(self):
         """Runs the server, handling graceful shutdown and errors."""
@@ -101,35 +237,23 @@ class Server:
         except Exception as e:
             self.logger.exception("An error occurred: ", exc_info=e)
         finally:
-            # Ensures the socket is closed on shutdown or error
+            # Ensures the selector and socket are closed on shutdown or error
+            if self.selector is not None:
+                self.selector.close()
             self.sock.close()
-
-    def load_json(self, path: str) -> dict:
-        """Loads JSON data from a file, returning it as a dictionary."""
-        try:
-            with open(path, "r") as file:
-                return json.load(file)
-        except FileNotFoundError:
-            self.logger.error(f"File not found: {path}")
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Invalid JSON file provided: {e}", exc_info=e)
-        # Returns None if loading fails
-        return None
+            # Write out pending rows, sync them to disk and close the fd
+            if self.out_buf:
+                os.write(self.csv_fd, self.out_buf)
+                self.out_buf.clear()
+            os.fdatasync(self.csv_fd)
+            os.close(self.csv_fd)
 
     def set_name(self) -> None:
-        cur_path = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(cur_path)
-        self.name = os.path.basename(parent_dir)
+        self.name = config.get_name()
 
     def set_server_creds(self) -> None:
         """Sets the server's IP and port from a configuration file."""
-        # Path to the configuration file
-        path = f"/home/{self.name}/wafer-handling-cell/server.json"
-        credentials = self.load_json(path)
-        if credentials is None:
-            raise ValueError(f"Credentials could not be loaded: {path}")
-        self.server_ip = credentials.get("ip", "")
-        self.server_port = credentials.get("port", 0)
+        self.server_ip, self.server_port = config.load_server_creds(self.name)
 
     def set_output_csv(self) -> None:
         """
@@ -157,8 +281,11 @@ class Server:
         # Check if the CSV file already exists and has a header
         file_exists = os.path.isfile(self.csv_path)
 
-        with open(self.csv_path, "a", newline="") as file:
-            writer = csv.writer(file)
-            # If the file doesn't exist, write the header first
-            if not file_exists:
-                writer.writerow(headers)
+        # Open the file descriptor once and keep it for the server's lifetime;
+        # the selector loop writes buffered rows to it directly with os.write
+        self.csv_fd = os.open(
+            self.csv_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644
+        )
+        # If the file doesn't exist, write the header first
+        if not file_exists:
+            os.write(self.csv_fd, (",".join(headers) + "\n").encode("utf-8"))